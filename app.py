@@ -1,4 +1,5 @@
 from flask import Flask, request, send_from_directory, render_template
+from flask.json.provider import DefaultJSONProvider, JSONProvider
 from flask_cors import CORS
 from routes.search import search_bp
 from routes.credentials import credentials_bp
@@ -17,6 +18,7 @@ import atexit
 import sys
 import redis
 import socket
+import orjson
 
 # Import Celery configuration and manager
 from routes.utils.celery_tasks import celery_app
@@ -124,9 +126,52 @@ def check_redis_connection():
     
     return False
 
+class ORJSONProvider(JSONProvider):
+    """
+    JSON provider backed by orjson, used by jsonify and request.get_json.
+    Output is always compact (no whitespace after separators).
+    """
+
+    # Same keyword options as Flask's DefaultJSONProvider
+    sort_keys = False
+    # Fallback for types orjson can't encode natively (dates, Decimal, UUID,
+    # dataclasses, __html__). Anything else raises a TypeError naming the type.
+    default = staticmethod(DefaultJSONProvider.default)
+
+    def _dumps_bytes(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option)
+
+    def dumps(self, obj, **kwargs):
+        # Formatting options such as indent and separators are not supported
+        return self._dumps_bytes(obj, **kwargs).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Same argument handling as jsonify: a single value, several
+        # positional values as a list, or keyword values as a dict
+        if args and kwargs:
+            raise TypeError("app.json.response() takes either args or kwargs, not both")
+        if not args and not kwargs:
+            obj = None
+        elif len(args) == 1:
+            obj = args[0]
+        else:
+            obj = args or kwargs
+        
+        # Write orjson's bytes straight into the response body
+        return self._app.response_class(self._dumps_bytes(obj), mimetype='application/json')
+
 def create_app():
     app = Flask(__name__)
     
+    # Use orjson for all JSON (de)serialization
+    app.json = ORJSONProvider(app)
+    
     # Set up CORS
     CORS(app)
 
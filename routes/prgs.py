@@ -1,13 +1,18 @@
 from flask import Blueprint, abort, jsonify, Response, stream_with_context
+from werkzeug.exceptions import HTTPException
 import os
-import json
+import re
+import functools
+import concurrent.futures
 import logging
 import time
+import orjson
 
+from routes.utils.prg_files import read_prg_lines
 from routes.utils.celery_tasks import (
     get_task_info,
-    get_task_status,
-    get_last_task_status,
+    get_task_snapshot,
+    cache_task_response,
     get_all_tasks,
     cancel_task,
     retry_task,
@@ -23,6 +28,260 @@ prgs_bp = Blueprint('prgs', __name__, url_prefix='/api/prgs')
 # The old path for PRG files (keeping for backward compatibility during transition)
 PRGS_DIR = os.path.join(os.getcwd(), 'prgs')
 
+# Whether PRGS_DIR exists; only re-checked while it has not been found
+_prgs_dir_exists = os.path.isdir(PRGS_DIR)
+
+def _detect_legacy_prgs():
+    """Check whether the old PRG directory contains any PRG files"""
+    try:
+        with os.scandir(PRGS_DIR) as entries:
+            return any(entry.name.endswith('.prg') for entry in entries)
+    except (FileNotFoundError, NotADirectoryError):
+        return False
+
+# Whether the old PRG file system is served at all. Detected once at startup
+# unless forced on or off with the LEGACY_PRGS environment variable.
+_legacy_prgs_env = os.environ.get('LEGACY_PRGS', 'auto').lower()
+if _legacy_prgs_env in ('true', '1', 'yes', 'on'):
+    _LEGACY_ENABLED = True
+elif _legacy_prgs_env in ('false', '0', 'no', 'off'):
+    _LEGACY_ENABLED = False
+else:
+    _LEGACY_ENABLED = _detect_legacy_prgs()
+
+# Allowed PRG file names, preventing path traversal attacks
+_SAFE_TASK_ID = re.compile(r'\A[A-Za-z0-9_-][A-Za-z0-9._-]{0,127}\Z').fullmatch
+
+# Event type reported to the client for each status (like in the previous
+# SSE implementation); any other status is reported as an "update"
+_EVENT_TYPE_BY_STATUS = {
+    ProgressState.COMPLETE: "complete",
+    ProgressState.DONE: "complete",
+    ProgressState.TRACK_COMPLETE: "track_complete",
+    ProgressState.ERROR: "error",
+    ProgressState.TRACK_PROGRESS: "progress",
+    ProgressState.REAL_TIME: "progress",
+}
+
+# Statuses after which a task never changes again
+_TERMINAL_STATUSES = frozenset({ProgressState.COMPLETE, ProgressState.ERROR, ProgressState.CANCELLED})
+
+# How long serialized responses of terminal tasks are cached. Active tasks
+# are not cached: every new status invalidates the entry, so caching them
+# would add a write round-trip to nearly every poll.
+TERMINAL_RESPONSE_TTL = 60 * 60  # 1 hour
+
+def _has_prgs_dir():
+    """Check whether the old PRG directory exists, caching a positive result"""
+    global _prgs_dir_exists
+    if not _prgs_dir_exists:
+        _prgs_dir_exists = os.path.isdir(PRGS_DIR)
+    return _prgs_dir_exists
+
+def _list_prg_filenames():
+    """Yield the names of the PRG files in the old PRG directory"""
+    global _prgs_dir_exists
+    if not _has_prgs_dir():
+        return
+    try:
+        entries = os.scandir(PRGS_DIR)
+    except FileNotFoundError:
+        # The directory was removed since it was last seen
+        _prgs_dir_exists = False
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.endswith('.prg'):
+                yield entry.name
+
+@functools.lru_cache(maxsize=1024)
+def _build_legacy_prg_response(task_id, mtime_ns, size):
+    """
+    Build the serialized get_prg_file response for an old PRG file.
+    
+    PRG files are append-only, so the result is memoized on the file's
+    modification time and size and reused until the file changes.
+    """
+    filepath = os.path.join(PRGS_DIR, task_id)
+
+    lines = read_prg_lines(filepath)
+
+    # If the file is empty, return default values.
+    if not lines:
+        return orjson.dumps({
+            "type": "",
+            "name": "",
+            "artist": "",
+            "last_line": None,
+            "original_request": None,
+            "display_title": "",
+            "display_type": "",
+            "display_artist": "",
+            "task_id": task_id,
+            "event": "unknown"
+        })
+
+    # Attempt to extract the original request from the first line.
+    original_request = None
+    display_title = ""
+    display_type = ""
+    display_artist = ""
+
+    try:
+        first_line = orjson.loads(lines[0])
+        if isinstance(first_line, dict):
+            if "original_request" in first_line:
+                original_request = first_line["original_request"]
+            else:
+                # The first line might be the original request itself
+                original_request = first_line
+
+            # Extract display information from the original request
+            if original_request:
+                display_title = original_request.get("display_title", original_request.get("name", ""))
+                display_type = original_request.get("display_type", original_request.get("type", ""))
+                display_artist = original_request.get("display_artist", original_request.get("artist", ""))
+    except Exception as e:
+        print(f"Error parsing first line of PRG file: {e}")
+        original_request = None
+
+    # For resource type and name, use the second line if available.
+    resource_type = ""
+    resource_name = ""
+    resource_artist = ""
+    if len(lines) > 1:
+        try:
+            second_line = orjson.loads(lines[1])
+            # Directly extract 'type' and 'name' from the JSON
+            resource_type = second_line.get("type", "")
+            resource_name = second_line.get("name", "")
+            resource_artist = second_line.get("artist", "")
+        except Exception:
+            resource_type = ""
+            resource_name = ""
+            resource_artist = ""
+    else:
+        resource_type = ""
+        resource_name = ""
+        resource_artist = ""
+
+    # Get the last line from the file.
+    last_line_raw = lines[-1]
+    try:
+        last_line_parsed = orjson.loads(last_line_raw)
+    except Exception:
+        last_line_parsed = last_line_raw.decode('utf-8', errors='replace')  # Fallback to raw string if JSON parsing fails.
+
+    return orjson.dumps({
+        "type": resource_type,
+        "name": resource_name,
+        "artist": resource_artist,
+        "last_line": last_line_parsed,
+        "original_request": original_request,
+        "display_title": display_title,
+        "display_type": display_type,
+        "display_artist": display_artist,
+        "task_id": task_id,
+        "event": "unknown",  # Old files don't have event types
+        "timestamp": time.time()
+    })
+
+def _fill_terminal(response, last_status, last_progress):
+    """Fill in the response for terminal statuses (complete, error, cancelled)"""
+    response["progress_message"] = last_status.get("message", f"Download {last_status.get('status')}")
+
+def _fill_progress(response, last_status, last_progress):
+    """Fill in the response for album/playlist track progress"""
+    track_info = last_status.get("track", "")
+    if not track_info:
+        _fill_default(response, last_status, last_progress)
+        return
+    
+    current = last_status.get("parsed_current_track", 0)
+    total = last_status.get("parsed_total_tracks", 0)
+    progress = last_status.get("overall_progress", 0)
+    
+    # Add explicit track progress fields to the top level for easy access
+    response["current_track"] = track_info
+    response["track_number"] = current
+    response["total_tracks"] = total
+    response["progress_percent"] = progress
+    response["album"] = last_status.get("album", "")
+    
+    # Format a nice progress message for display
+    if current and total:
+        response["progress_message"] = f"Downloading track {current}/{total} ({progress}%): {track_info}"
+    else:
+        response["progress_message"] = f"Downloading: {track_info}"
+
+def _fill_real_time(response, last_status, last_progress):
+    """Fill in the response for real-time status messages"""
+    song = last_status.get("song", "")
+    percent = last_status.get("percent", 0)
+    
+    # Add real-time specific fields
+    response["current_song"] = song
+    response["percent"] = percent
+    response["percentage"] = last_status.get("percentage", 0)
+    response["time_elapsed"] = last_status.get("time_elapsed", 0)
+    
+    # Format a nice progress message for display
+    if song:
+        response["progress_message"] = f"Downloading {song} ({percent}%)"
+    else:
+        response["progress_message"] = f"Downloading ({percent}%)"
+
+def _fill_initializing(response, last_status, last_progress):
+    """Fill in the response for initializing status"""
+    album = last_status.get("album", "")
+    if album:
+        response["progress_message"] = f"Initializing download for {album}"
+    else:
+        response["progress_message"] = "Initializing download..."
+
+def _fill_processing(response, last_status, last_progress):
+    """Fill in the response for processing status using the most recent track progress"""
+    if not last_progress:
+        # Just use the processing message
+        response["progress_message"] = last_status.get("message", "Processing download...")
+        return
+    
+    # Use the most recent track progress information
+    track_info = last_progress.get("track", "")
+    current_raw = last_progress.get("current_track", "")
+    response["current_track"] = track_info
+    
+    # Try to parse track numbers if available
+    if isinstance(current_raw, str) and "/" in current_raw:
+        try:
+            parts = current_raw.split("/")
+            current = int(parts[0])
+            total = int(parts[1])
+            response["track_number"] = current
+            response["total_tracks"] = total
+            response["progress_percent"] = min(int((current / total) * 100), 100)
+            response["progress_message"] = f"Processing track {current}/{total}: {track_info}"
+        except (ValueError, IndexError):
+            response["progress_message"] = f"Processing: {track_info}"
+    else:
+        response["progress_message"] = f"Processing: {track_info}"
+
+def _fill_default(response, last_status, last_progress):
+    """Fill in the response for other status types"""
+    response["progress_message"] = last_status.get("message", f"Status: {last_status.get('status', 'unknown')}")
+
+# Response handlers by status type. Each handler takes the response being
+# built, the last status and the most recent track progress status (if any).
+_STATUS_HANDLERS = {
+    ProgressState.COMPLETE: _fill_terminal,
+    ProgressState.ERROR: _fill_terminal,
+    ProgressState.CANCELLED: _fill_terminal,
+    ProgressState.PROGRESS: _fill_progress,
+    ProgressState.REAL_TIME: _fill_real_time,
+    ProgressState.INITIALIZING: _fill_initializing,
+    ProgressState.PROCESSING: _fill_processing,
+}
+
 @prgs_bp.route('/<task_id>', methods=['GET'])
 def get_prg_file(task_id):
     """
@@ -36,32 +295,36 @@ def get_prg_file(task_id):
         task_id: Either a task UUID from Celery or a PRG filename from the old system
     """
     try:
-        # First check if this is a task ID in the new system
-        task_info = get_task_info(task_id)
+        # First check if this is a task ID in the new system. The cached
+        # response, task info, latest status update, status count and last
+        # track progress all come from the same round-trip.
+        cached_response, task_info, last_status, status_count, last_progress = get_task_snapshot(task_id)
+        
+        # Serve a cached response if this task has one
+        if cached_response:
+            return Response(cached_response, mimetype='application/json')
         
         if task_info:
             # This is a task ID in the new system
             original_request = task_info.get("original_request", {})
+            resource_type = task_info.get("type", "")
+            resource_name = task_info.get("name", "")
+            resource_artist = task_info.get("artist", "")
             
-            # Get the latest status update for this task
-            last_status = get_last_task_status(task_id)
-            logger.debug(f"API: Got last_status for {task_id}: {json.dumps(last_status) if last_status else None}")
-            
-            # Get all status updates for debugging
-            all_statuses = get_task_status(task_id)
-            status_count = len(all_statuses)
-            logger.debug(f"API: Task {task_id} has {status_count} status updates")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("API: Got last_status for %s: %s", task_id, orjson.dumps(last_status).decode() if last_status else None)
+            logger.debug("API: Task %s has %s status updates", task_id, status_count)
             
             # Prepare the response with basic info
             response = {
-                "type": task_info.get("type", ""),
-                "name": task_info.get("name", ""),
-                "artist": task_info.get("artist", ""),
+                "type": resource_type,
+                "name": resource_name,
+                "artist": resource_artist,
                 "last_line": last_status,
                 "original_request": original_request,
-                "display_title": original_request.get("display_title", task_info.get("name", "")),
-                "display_type": original_request.get("display_type", task_info.get("type", "")),
-                "display_artist": original_request.get("display_artist", task_info.get("artist", "")),
+                "display_title": original_request.get("display_title", resource_name),
+                "display_type": original_request.get("display_type", resource_type),
+                "display_artist": original_request.get("display_artist", resource_artist),
                 "status_count": status_count,
                 "task_id": task_id,
                 "timestamp": time.time()
@@ -71,196 +334,33 @@ def get_prg_file(task_id):
             if last_status:
                 status_type = last_status.get("status", "unknown")
                 
-                # Set event type based on status (like in the previous SSE implementation)
-                event_type = "update"
-                if status_type in [ProgressState.COMPLETE, ProgressState.DONE]:
-                    event_type = "complete"
-                elif status_type == ProgressState.TRACK_COMPLETE:
-                    event_type = "track_complete"
-                elif status_type == ProgressState.ERROR:
-                    event_type = "error"
-                elif status_type in [ProgressState.TRACK_PROGRESS, ProgressState.REAL_TIME]:
-                    event_type = "progress"
-                    
-                response["event"] = event_type
-                
-                # For terminal statuses (complete, error, cancelled)
-                if status_type in [ProgressState.COMPLETE, ProgressState.ERROR, ProgressState.CANCELLED]:
-                    response["progress_message"] = last_status.get("message", f"Download {status_type}")
-                
-                # For progress status with track information
-                elif status_type == "progress" and last_status.get("track"):
-                    # Add explicit track progress fields to the top level for easy access
-                    response["current_track"] = last_status.get("track", "")
-                    response["track_number"] = last_status.get("parsed_current_track", 0)
-                    response["total_tracks"] = last_status.get("parsed_total_tracks", 0)
-                    response["progress_percent"] = last_status.get("overall_progress", 0)
-                    response["album"] = last_status.get("album", "")
-                    
-                    # Format a nice progress message for display
-                    track_info = last_status.get("track", "")
-                    current = last_status.get("parsed_current_track", 0)
-                    total = last_status.get("parsed_total_tracks", 0)
-                    progress = last_status.get("overall_progress", 0)
-                    
-                    if current and total:
-                        response["progress_message"] = f"Downloading track {current}/{total} ({progress}%): {track_info}"
-                    elif track_info:
-                        response["progress_message"] = f"Downloading: {track_info}"
-                
-                # For real-time status messages
-                elif status_type == "real_time":
-                    # Add real-time specific fields
-                    response["current_song"] = last_status.get("song", "")
-                    response["percent"] = last_status.get("percent", 0)
-                    response["percentage"] = last_status.get("percentage", 0)
-                    response["time_elapsed"] = last_status.get("time_elapsed", 0)
-                    
-                    # Format a nice progress message for display
-                    song = last_status.get("song", "")
-                    percent = last_status.get("percent", 0)
-                    if song:
-                        response["progress_message"] = f"Downloading {song} ({percent}%)"
-                    else:
-                        response["progress_message"] = f"Downloading ({percent}%)"
-                
-                # For initializing status
-                elif status_type == "initializing":
-                    album = last_status.get("album", "")
-                    if album:
-                        response["progress_message"] = f"Initializing download for {album}"
-                    else:
-                        response["progress_message"] = "Initializing download..."
-                
-                # For processing status (default)
-                elif status_type == "processing":
-                    # Search for the most recent track progress in all statuses
-                    has_progress = False
-                    for status in reversed(all_statuses):
-                        if status.get("status") == "progress" and status.get("track"):
-                            # Use this track progress information
-                            track_info = status.get("track", "")
-                            current_raw = status.get("current_track", "")
-                            response["current_track"] = track_info
-                            
-                            # Try to parse track numbers if available
-                            if isinstance(current_raw, str) and "/" in current_raw:
-                                try:
-                                    parts = current_raw.split("/")
-                                    current = int(parts[0])
-                                    total = int(parts[1])
-                                    response["track_number"] = current
-                                    response["total_tracks"] = total
-                                    response["progress_percent"] = min(int((current / total) * 100), 100)
-                                    response["progress_message"] = f"Processing track {current}/{total}: {track_info}"
-                                except (ValueError, IndexError):
-                                    response["progress_message"] = f"Processing: {track_info}"
-                            else:
-                                response["progress_message"] = f"Processing: {track_info}"
-                                
-                            has_progress = True
-                            break
-                    
-                    if not has_progress:
-                        # Just use the processing message
-                        response["progress_message"] = last_status.get("message", "Processing download...")
+                # Set event type based on status
+                response["event"] = _EVENT_TYPE_BY_STATUS.get(status_type, "update")
                 
-                # For other status types
-                else:
-                    response["progress_message"] = last_status.get("message", f"Status: {status_type}")
+                # Fill in status specific fields and the progress message
+                handler = _STATUS_HANDLERS.get(status_type, _fill_default)
+                handler(response, last_status, last_progress)
             
-            return jsonify(response)
+            payload = orjson.dumps(response)
+            if last_status and last_status.get("status") in _TERMINAL_STATUSES:
+                cache_task_response(task_id, payload, TERMINAL_RESPONSE_TTL, status_count)
+            
+            return Response(payload, mimetype='application/json')
         
         # If not found in new system, try the old PRG file system
+        if not _LEGACY_ENABLED:
+            abort(404, "Task not found")
+        
         # Security check to prevent path traversal attacks.
-        if '..' in task_id or '/' in task_id:
+        if not _SAFE_TASK_ID(task_id):
             abort(400, "Invalid file request")
 
         filepath = os.path.join(PRGS_DIR, task_id)
-
-        with open(filepath, 'r') as f:
-            content = f.read()
-            lines = content.splitlines()
-
-        # If the file is empty, return default values.
-        if not lines:
-            return jsonify({
-                "type": "",
-                "name": "",
-                "artist": "",
-                "last_line": None,
-                "original_request": None,
-                "display_title": "",
-                "display_type": "",
-                "display_artist": "",
-                "task_id": task_id,
-                "event": "unknown"
-            })
-
-        # Attempt to extract the original request from the first line.
-        original_request = None
-        display_title = ""
-        display_type = ""
-        display_artist = ""
-        
-        try:
-            first_line = json.loads(lines[0])
-            if isinstance(first_line, dict):
-                if "original_request" in first_line:
-                    original_request = first_line["original_request"]
-                else:
-                    # The first line might be the original request itself
-                    original_request = first_line
-                
-                # Extract display information from the original request
-                if original_request:
-                    display_title = original_request.get("display_title", original_request.get("name", ""))
-                    display_type = original_request.get("display_type", original_request.get("type", ""))
-                    display_artist = original_request.get("display_artist", original_request.get("artist", ""))
-        except Exception as e:
-            print(f"Error parsing first line of PRG file: {e}")
-            original_request = None
-
-        # For resource type and name, use the second line if available.
-        resource_type = ""
-        resource_name = ""
-        resource_artist = ""
-        if len(lines) > 1:
-            try:
-                second_line = json.loads(lines[1])
-                # Directly extract 'type' and 'name' from the JSON
-                resource_type = second_line.get("type", "")
-                resource_name = second_line.get("name", "")
-                resource_artist = second_line.get("artist", "")
-            except Exception:
-                resource_type = ""
-                resource_name = ""
-                resource_artist = ""
-        else:
-            resource_type = ""
-            resource_name = ""
-            resource_artist = ""
-
-        # Get the last line from the file.
-        last_line_raw = lines[-1]
-        try:
-            last_line_parsed = json.loads(last_line_raw)
-        except Exception:
-            last_line_parsed = last_line_raw  # Fallback to raw string if JSON parsing fails.
-
-        return jsonify({
-            "type": resource_type,
-            "name": resource_name,
-            "artist": resource_artist,
-            "last_line": last_line_parsed,
-            "original_request": original_request,
-            "display_title": display_title,
-            "display_type": display_type,
-            "display_artist": display_artist,
-            "task_id": task_id,
-            "event": "unknown",  # Old files don't have event types
-            "timestamp": time.time()
-        })
+        st = os.stat(filepath)
+        payload = _build_legacy_prg_response(task_id, st.st_mtime_ns, st.st_size)
+        return Response(payload, mimetype='application/json')
+    except HTTPException:
+        raise
     except FileNotFoundError:
         abort(404, "Task or file not found")
     except Exception as e:
@@ -285,18 +385,22 @@ def delete_prg_file(task_id):
             # if it's still running, then clear its data from Redis
             cancel_result = cancel_task(task_id)
             
-            # Use Redis connection to delete the task data
-            from routes.utils.celery_tasks import redis_client
-            
-            # Delete task info and status
-            redis_client.delete(f"task:{task_id}:info")
-            redis_client.delete(f"task:{task_id}:status")
+            # Delete task info and status in a single round-trip
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.delete(f"task:{task_id}:info")
+            pipe.delete(f"task:{task_id}:status")
+            pipe.delete(f"task:{task_id}:last_progress")
+            pipe.delete(f"task:{task_id}:response")
+            pipe.execute()
             
             return {'message': f'Task {task_id} deleted successfully'}, 200
         
         # If not found in Redis, try the old PRG file system
+        if not _LEGACY_ENABLED:
+            abort(404, "Task not found")
+        
         # Security checks to prevent path traversal and ensure correct file type.
-        if '..' in task_id or '/' in task_id:
+        if not _SAFE_TASK_ID(task_id):
             abort(400, "Invalid file request")
         if not task_id.endswith('.prg'):
             abort(400, "Only .prg files can be deleted")
@@ -308,6 +412,8 @@ def delete_prg_file(task_id):
         
         os.remove(filepath)
         return {'message': f'File {task_id} deleted successfully'}, 200
+    except HTTPException:
+        raise
     except FileNotFoundError:
         abort(404, "Task or file not found")
     except Exception as e:
@@ -321,22 +427,23 @@ def list_prg_files():
     Combines results from both the old PRG file system and the new task ID based system.
     """
     try:
-        # Get tasks from the new system
-        tasks = get_all_tasks()
-        task_ids = [task["task_id"] for task in tasks]
-        
-        # Get PRG files from the old system
-        prg_files = []
-        if os.path.isdir(PRGS_DIR):
-            with os.scandir(PRGS_DIR) as entries:
-                for entry in entries:
-                    if entry.is_file() and entry.name.endswith('.prg'):
-                        prg_files.append(entry.name)
+        if _LEGACY_ENABLED:
+            # Fetch tasks from the new system and PRG files from the old
+            # system concurrently, so the wait is the slower of the two
+            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+                tasks_future = executor.submit(get_all_tasks)
+                prg_files_future = executor.submit(lambda: list(_list_prg_filenames()))
+                tasks = tasks_future.result()
+                prg_files = prg_files_future.result()
+        else:
+            # Get tasks from the new system only
+            tasks = get_all_tasks()
+            prg_files = []
         
         # Combine both lists
-        all_ids = task_ids + prg_files
+        all_ids = [task["task_id"] for task in tasks] + prg_files
         
-        return jsonify(all_ids)
+        return Response(orjson.dumps(all_ids), mimetype='application/json')
     except Exception as e:
         abort(500, f"An error occurred: {e}")
 
@@ -24,6 +24,9 @@ from routes.utils.celery_tasks import (
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# States of tasks that cancel_all leaves alone
+_UNCANCELLABLE_STATES = frozenset((ProgressState.COMPLETE, ProgressState.CANCELLED))
+
 # Load configuration
 CONFIG_PATH = './config/main.json'
 try:
@@ -276,7 +279,7 @@ class CeleryDownloadQueueManager:
             status = task.get("status")
             
             # Only cancel tasks that are not already completed or cancelled
-            if status not in [ProgressState.COMPLETE, ProgressState.CANCELLED]:
+            if status not in _UNCANCELLABLE_STATES:
                 result = cancel_celery_task(task_id)
                 if result.get("status") == "cancelled":
                     cancelled_count += 1
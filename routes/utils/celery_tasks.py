@@ -1,5 +1,6 @@
 import time
 import json
+import orjson
 import uuid
 import logging
 import traceback
@@ -45,6 +46,9 @@ class ProgressState:
     SKIPPED = "skipped"
     DONE = "done"
 
+# States after which the task postrun handler must not overwrite the status
+_FINAL_STATES = frozenset((ProgressState.COMPLETE, ProgressState.ERROR))
+
 # Reuse the application's logging configuration for Celery workers
 @setup_logging.connect
 def setup_celery_logging(**kwargs):
@@ -64,6 +68,17 @@ def worker_init_handler(**kwargs):
     logger.info(f"Worker config: spotifyQuality={config.get('spotifyQuality')}, deezerQuality={config.get('deezerQuality')}")
     logger.debug("Worker Redis connection: " + REDIS_URL)
 
+def _loads(raw):
+    """
+    Decode a JSON value stored in Redis with orjson, falling back to the
+    standard library for entries written by json.dumps that orjson rejects
+    (NaN/Infinity, lone surrogate escapes)
+    """
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return json.loads(raw.decode('utf-8'))
+
 def store_task_status(task_id, status_data):
     """
     Store task status information in Redis with a sequential ID
@@ -82,19 +97,30 @@ def store_task_status(task_id, status_data):
         status_data['id'] = status_id
         
         # Convert to JSON and store in Redis
-        redis_client.rpush(f"task:{task_id}:status", json.dumps(status_data))
+        status_json = orjson.dumps(status_data, option=orjson.OPT_NON_STR_KEYS)
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.rpush(f"task:{task_id}:status", status_json)
+        
+        # Keep the most recent track progress separately so it can be read
+        # without scanning the whole status list
+        if status_data.get("status") == ProgressState.PROGRESS and status_data.get("track"):
+            pipe.set(f"task:{task_id}:last_progress", status_json, ex=60 * 60 * 24 * 7)  # 7 days
+        
+        # Invalidate any cached API response for this task
+        pipe.delete(f"task:{task_id}:response")
         
         # Set expiry for the list to avoid filling up Redis with old data
-        redis_client.expire(f"task:{task_id}:status", 60 * 60 * 24 * 7)  # 7 days
-        redis_client.expire(f"task:{task_id}:status:next_id", 60 * 60 * 24 * 7)  # 7 days
+        pipe.expire(f"task:{task_id}:status", 60 * 60 * 24 * 7)  # 7 days
+        pipe.expire(f"task:{task_id}:status:next_id", 60 * 60 * 24 * 7)  # 7 days
         
         # Publish an update event to a Redis channel for subscribers
         # This will be used by the SSE endpoint to push updates in real-time
         update_channel = f"task_updates:{task_id}"
-        redis_client.publish(update_channel, json.dumps({
+        pipe.publish(update_channel, json.dumps({
             "task_id": task_id, 
             "status_id": status_id
         }))
+        pipe.execute()
     except Exception as e:
         logger.error(f"Error storing task status: {e}")
         traceback.print_exc()
@@ -121,11 +147,47 @@ def get_last_task_status(task_id):
         logger.error(f"Error getting last task status: {e}")
         return None
 
+def get_task_snapshot(task_id):
+    """
+    Get the cached API response, task info, the most recent status update,
+    the number of status updates and the most recent track progress update
+    for a task in a single Redis round-trip
+    
+    When a cached response exists the other entries are not decoded and are
+    returned empty.
+    
+    Returns:
+        tuple: (cached_response, task_info, last_status, status_count, last_progress)
+    """
+    try:
+        # MULTI/EXEC so the last status and status count are read atomically;
+        # cache_task_response relies on them describing the same state
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.get(f"task:{task_id}:response")
+        pipe.get(f"task:{task_id}:info")
+        pipe.lrange(f"task:{task_id}:status", -1, -1)
+        pipe.llen(f"task:{task_id}:status")
+        pipe.get(f"task:{task_id}:last_progress")
+        cached_response, raw_info, status_list, status_count, raw_progress = pipe.execute()
+        
+        if cached_response:
+            return cached_response, {}, None, 0, None
+        
+        task_info = _loads(raw_info) if raw_info else {}
+        last_status = _loads(status_list[0]) if status_list else None
+        last_progress = _loads(raw_progress) if raw_progress else None
+        return None, task_info, last_status, status_count, last_progress
+    except Exception as e:
+        logger.error(f"Error getting task snapshot: {e}")
+        return None, {}, None, 0, None
+
 def store_task_info(task_id, task_info):
     """Store task information in Redis"""
     try:
-        redis_client.set(f"task:{task_id}:info", json.dumps(task_info))
-        redis_client.expire(f"task:{task_id}:info", 60 * 60 * 24 * 7)  # 7 days
+        # Store the whole info dict as one JSON blob, with its expiry set in the same command
+        payload = orjson.dumps(task_info, option=orjson.OPT_NON_STR_KEYS)
+        redis_client.set(f"task:{task_id}:info", payload, ex=60 * 60 * 24 * 7)  # 7 days
+        redis_client.delete(f"task:{task_id}:response")
     except Exception as e:
         logger.error(f"Error storing task info: {e}")
 
@@ -134,12 +196,45 @@ def get_task_info(task_id):
     try:
         task_info = redis_client.get(f"task:{task_id}:info")
         if task_info:
-            return json.loads(task_info.decode('utf-8'))
+            return _loads(task_info)
         return {}
     except Exception as e:
         logger.error(f"Error getting task info: {e}")
         return {}
 
+# Sets the cached response only while the task still exists and no status
+# has been added since the response was built, so a slow request can never
+# overwrite a newer state or resurrect a deleted task
+_cache_task_response_script = redis_client.register_script("""
+if redis.call('EXISTS', KEYS[1]) == 1 and redis.call('LLEN', KEYS[2]) == tonumber(ARGV[1]) then
+    redis.call('SET', KEYS[3], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+""")
+
+def cache_task_response(task_id, payload, ttl, status_count):
+    """
+    Cache a serialized API response for a task in Redis
+    
+    The cache entry is invalidated whenever the task's status or info changes,
+    and is only written if the task still has the status count the response
+    was built from.
+    
+    Args:
+        task_id: The task ID
+        payload: The serialized response body
+        ttl: Time to live in seconds
+        status_count: Number of status updates the response was built from
+    """
+    try:
+        _cache_task_response_script(
+            keys=[f"task:{task_id}:info", f"task:{task_id}:status", f"task:{task_id}:response"],
+            args=[status_count, payload, ttl]
+        )
+    except Exception as e:
+        logger.error(f"Error caching task response: {e}")
+
 def cancel_task(task_id):
     """Cancel a task by its ID"""
     try:
@@ -300,16 +395,31 @@ def get_all_tasks():
     """Get all active task IDs"""
     try:
         # Get all keys matching the task info pattern
-        task_keys = redis_client.keys("task:*:info")
+        # (a large COUNT keeps the number of SCAN round-trips low)
+        task_keys = redis_client.scan_iter(match="task:*:info", count=1000)
         
-        # Extract task IDs from the keys
-        task_ids = [key.decode('utf-8').split(':')[1] for key in task_keys]
+        # Extract task IDs from the keys, dropping duplicates SCAN may return
+        task_ids = list(dict.fromkeys(key.decode('utf-8').split(':')[1] for key in task_keys))
+        
+        # Fetch info and last status for every task in a single round-trip
+        pipe = redis_client.pipeline(transaction=False)
+        for task_id in task_ids:
+            pipe.get(f"task:{task_id}:info")
+            pipe.lrange(f"task:{task_id}:status", -1, -1)
+        results = pipe.execute()
         
         # Get info for each task
         tasks = []
-        for task_id in task_ids:
-            task_info = get_task_info(task_id)
-            last_status = get_last_task_status(task_id)
+        for task_id, raw_info, status_list in zip(task_ids, results[0::2], results[1::2]):
+            if not raw_info or not status_list:
+                continue
+            
+            try:
+                task_info = _loads(raw_info)
+                last_status = _loads(status_list[0])
+            except ValueError as e:
+                logger.error(f"Error decoding data for task {task_id}: {e}")
+                continue
             
             if task_info and last_status:
                 tasks.append({
@@ -767,7 +877,7 @@ def task_postrun_handler(task_id=None, task=None, retval=None, state=None, *args
     try:
         # Skip if task is already marked as complete or error in Redis
         last_status = get_last_task_status(task_id)
-        if last_status and last_status.get("status") in [ProgressState.COMPLETE, ProgressState.ERROR]:
+        if last_status and last_status.get("status") in _FINAL_STATES:
             return
         
         # Get task info
@@ -0,0 +1,53 @@
+import os
+
+
+def read_prg_lines(filepath, block_size=4096):
+    """
+    Read the first two lines and the last non-empty line of a PRG file
+    without loading the whole file into memory.
+    
+    Returns:
+        list: Up to three lines as bytes (first, second, last), or an empty
+        list if the file is empty. Files with one or two lines (ignoring
+        trailing blank lines) return just those lines.
+    """
+    with open(filepath, 'rb') as f:
+        first = f.readline()
+        if not first:
+            return []
+        second = f.readline()
+        if not second:
+            return [first.rstrip(b'\r\n')]
+        
+        lines = [first.rstrip(b'\r\n'), second.rstrip(b'\r\n')]
+        
+        # Scan backwards from the end for the last non-blank line, growing
+        # the window until that line is complete or the start of the tail
+        # is reached
+        head_end = f.tell()
+        pos = f.seek(0, os.SEEK_END)
+        tail = b''
+        while pos > head_end:
+            read_size = min(block_size, pos - head_end)
+            pos -= read_size
+            f.seek(pos)
+            tail = f.read(read_size) + tail
+            
+            # End of the last non-whitespace content; keep reading while
+            # everything seen so far is blank
+            content_end = len(tail.rstrip())
+            if not content_end:
+                continue
+            
+            newline = tail.rfind(b'\n', 0, content_end)
+            if newline == -1 and pos > head_end:
+                # The start of the line has not been read yet
+                continue
+            
+            line_end = tail.find(b'\n', content_end)
+            if line_end == -1:
+                line_end = len(tail)
+            lines.append(tail[newline + 1:line_end].rstrip(b'\r'))
+            break
+        
+        return lines
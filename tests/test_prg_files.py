@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+
+from routes.utils.prg_files import read_prg_lines
+
+
+class ReadPrgLinesTest(unittest.TestCase):
+
+    def read(self, content, block_size=16):
+        fd, path = tempfile.mkstemp(suffix='.prg')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        return read_prg_lines(path, block_size=block_size)
+
+    def test_empty_file(self):
+        self.assertEqual(self.read(b''), [])
+
+    def test_one_line(self):
+        self.assertEqual(self.read(b'a'), [b'a'])
+        self.assertEqual(self.read(b'a\n'), [b'a'])
+
+    def test_two_lines(self):
+        self.assertEqual(self.read(b'a\nb'), [b'a', b'b'])
+        self.assertEqual(self.read(b'a\nb\n'), [b'a', b'b'])
+
+    def test_three_or_more_lines(self):
+        self.assertEqual(self.read(b'a\nb\nc\n'), [b'a', b'b', b'c'])
+        self.assertEqual(self.read(b'a\nb\nc\nd\ne'), [b'a', b'b', b'e'])
+
+    def test_trailing_blank_lines(self):
+        self.assertEqual(self.read(b'a\nb\nc\n   \n'), [b'a', b'b', b'c'])
+        self.assertEqual(self.read(b'a\nb\nc\n\n' + b' ' * 40 + b'\n\n'), [b'a', b'b', b'c'])
+        self.assertEqual(self.read(b'a\nb\n\n\n'), [b'a', b'b'])
+
+    def test_crlf(self):
+        self.assertEqual(self.read(b'a\r\nb\r\nc\r\n'), [b'a', b'b', b'c'])
+        self.assertEqual(self.read(b'a\r\nb\r\nc\r\n\r\n'), [b'a', b'b', b'c'])
+
+    def test_last_line_longer_than_block_size(self):
+        last = b'{"status": "' + b'x' * 100 + b'"}'
+        self.assertEqual(self.read(b'a\nb\n' + b'y' * 50 + b'\n' + last + b'\n'), [b'a', b'b', last])
+        self.assertEqual(self.read(b'a\nb\n' + last), [b'a', b'b', last])
+
+
+if __name__ == '__main__':
+    unittest.main()